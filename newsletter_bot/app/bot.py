@@ -1,11 +1,17 @@
 import logging
 from telegram import Update
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, ContextTypes
-import sqlite3
+from telegram.request import HTTPXRequest
+import asyncio
 import os
+import time
+import threading
 from dotenv import load_dotenv
 from datetime import datetime
 
+from database import Database
+
 load_dotenv()
 
 # Configure logging
@@ -15,47 +21,121 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class RateLimiter:
+    """Token bucket that keeps outgoing messages under Telegram's bot-wide limit"""
+    
+    def __init__(self, rate: float = 25):
+        self.rate = rate
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until another message may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    def pause(self, seconds: float):
+        """Halt all sends for the given number of seconds"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
 class NewsletterBot:
     def __init__(self):
         self.token = os.getenv('TELEGRAM_BOT_TOKEN')
         if not self.token:
             raise ValueError("TELEGRAM_BOT_TOKEN not found in environment variables")
         
-        self.app = Application.builder().token(self.token).build()
+        # Broadcasts share one multiplexed HTTP/2 pool; long polling keeps its own connection
+        request = HTTPXRequest(
+            connection_pool_size=64,
+            read_timeout=20,
+            write_timeout=20,
+            pool_timeout=5,
+            http_version='2'
+        )
+        self.app = (
+            Application.builder()
+            .token(self.token)
+            .request(request)
+            .get_updates_request(HTTPXRequest(read_timeout=20))
+            .build()
+        )
+        self.db = Database()
+        # Active subscriber count, kept current by the handlers and a periodic refresh
+        self.subscriber_count = None
+        self._count_lock = threading.Lock()
+        # Active subscribers as (user_id, first_name), reused across broadcasts for a short while.
+        # Any change bumps the generation so an in-flight reload cannot store a stale list.
+        self.subscriber_cache_ttl = 60
+        # (subscribers, loaded_at), or None when nothing is cached
+        self._subscriber_cache = None
+        self._subscriber_gen = 0
+        self._pending_logs = []
+        self._log_lock = threading.Lock()
+        self.rate_limiter = RateLimiter(rate=25)
+        self.send_retries = 3
         self.setup_handlers()
+        self.setup_jobs()
         self.init_database()
         logger.info("🤖 Newsletter Bot initialized")
     
     def init_database(self):
         """Initialize SQLite database"""
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            
-            # Create subscribers table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS subscribers (
-                    user_id INTEGER PRIMARY KEY,
-                    username TEXT,
-                    first_name TEXT,
-                    subscribed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            ''')
-            
-            # Create newsletter_logs table for tracking
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS newsletter_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT,
-                    processed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    subscribers_count INTEGER,
-                    success BOOLEAN DEFAULT TRUE
-                )
-            ''')
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                
+                # WAL lets readers proceed while a writer commits
+                cursor.execute('PRAGMA journal_mode=WAL')
+                
+                # Create subscribers table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS subscribers (
+                        user_id INTEGER PRIMARY KEY,
+                        username TEXT,
+                        first_name TEXT,
+                        subscribed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        is_active BOOLEAN DEFAULT TRUE
+                    )
+                ''')
+                
+                # Create newsletter_logs table for tracking
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS newsletter_logs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        title TEXT,
+                        processed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        subscribers_count INTEGER,
+                        success BOOLEAN DEFAULT TRUE
+                    )
+                ''')
+                
+                # Covering index: active counts and the broadcast list never touch the table
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_subs_active
+                    ON subscribers(is_active, user_id, first_name)
+                ''')
+                
+                # Range scans for the daily and weekly newsletter checks
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_logs_proc_succ
+                    ON newsletter_logs(processed_at, success)
+                ''')
             
-            conn.commit()
-            conn.close()
             logger.info("✅ Database initialized successfully")
             
         except Exception as e:
@@ -72,6 +152,15 @@ class NewsletterBot:
         self.app.add_handler(CommandHandler("stats", self.stats_command))
         logger.info("✅ Command handlers set up")
     
+    def setup_jobs(self):
+        """Set up recurring bot jobs"""
+        if self.app.job_queue:
+            self.app.job_queue.run_repeating(self._flush_logs_job, interval=10, first=10)
+            self.app.job_queue.run_repeating(self._refresh_count_job, interval=60, first=60)
+            logger.info("✅ Newsletter log flush and subscriber count jobs scheduled")
+        else:
+            logger.warning("⚠️ Job queue unavailable, newsletter logs flush on read and shutdown only")
+    
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
         welcome_message = """
@@ -103,25 +192,7 @@ Use /subscribe to get started!
         user = update.effective_user
         
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            
-            # Check if user already exists
-            cursor.execute('SELECT * FROM subscribers WHERE user_id = ?', (user.id,))
-            existing = cursor.fetchone()
-            
-            if existing:
-                cursor.execute('UPDATE subscribers SET is_active = TRUE WHERE user_id = ?', (user.id,))
-                message = "✅ **Welcome back!** You're now subscribed to AI newsletter summaries."
-            else:
-                cursor.execute('''
-                    INSERT INTO subscribers (user_id, username, first_name) 
-                    VALUES (?, ?, ?)
-                ''', (user.id, user.username, user.first_name))
-                message = "🎉 **Successfully subscribed!** You'll receive AI newsletter summaries tailored for South African professionals."
-            
-            conn.commit()
-            conn.close()
+            message = await self.db.run(self._do_subscribe, user.id, user.username, user.first_name)
             
             # Add helpful follow-up message
             message += "\n\n📅 **What to expect:**\n• Daily AI newsletter summaries\n• Focus on practical, actionable insights\n• South African business context\n\n🔔 You'll receive your first summary soon!"
@@ -138,11 +209,7 @@ Use /subscribe to get started!
         user = update.effective_user
         
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('UPDATE subscribers SET is_active = FALSE WHERE user_id = ?', (user.id,))
-            conn.commit()
-            conn.close()
+            await self.db.run(self._do_unsubscribe, user.id)
             
             message = "😢 **You've been unsubscribed** from AI newsletter summaries.\n\n💡 You can rejoin anytime with /subscribe\n\n🙏 Thanks for using AI Newsletter Bot SA!"
             await update.message.reply_text(message, parse_mode='Markdown')
@@ -157,11 +224,7 @@ Use /subscribe to get started!
         user = update.effective_user
         
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('SELECT is_active, subscribed_at FROM subscribers WHERE user_id = ?', (user.id,))
-            result = cursor.fetchone()
-            conn.close()
+            result = await self.db.run(self._do_status, user.id)
             
             if result and result[0]:
                 subscribed_date = result[1]
@@ -207,18 +270,7 @@ I summarize AI newsletters for South African professionals, focusing on actionab
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /stats command - public stats"""
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            
-            # Get subscriber count
-            cursor.execute('SELECT COUNT(*) FROM subscribers WHERE is_active = TRUE')
-            subscriber_count = cursor.fetchone()[0]
-            
-            # Get recent newsletter count
-            cursor.execute('SELECT COUNT(*) FROM newsletter_logs WHERE processed_at > datetime("now", "-7 days")')
-            recent_newsletters = cursor.fetchone()[0]
-            
-            conn.close()
+            subscriber_count, recent_newsletters = await self.db.run(self._do_stats)
             
             stats_message = f"""
 📊 **AI Newsletter Bot SA Stats**
@@ -239,33 +291,181 @@ I summarize AI newsletters for South African professionals, focusing on actionab
             logger.error(f"❌ Stats error: {e}")
             await update.message.reply_text("❌ Could not retrieve stats at the moment.")
     
-    def get_subscriber_count(self):
-        """Get current subscriber count"""
+    def _do_subscribe(self, user_id, username, first_name):
+        """Subscribe or reactivate a user; returns the reply message"""
+        with self.db.connection() as conn:
+            # Take the write lock first so the existence check and the UPSERT see the same row
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute('SELECT is_active FROM subscribers WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            existed = row is not None
+            conn.execute('''
+                INSERT INTO subscribers (user_id, username, first_name, is_active)
+                VALUES (?, ?, ?, TRUE)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    is_active = TRUE,
+                    username = excluded.username,
+                    first_name = excluded.first_name
+            ''', (user_id, username, first_name))
+        if not (existed and row[0]):
+            self._adjust_subscriber_count(1)
+        self.invalidate_subscribers()
+        
+        if existed:
+            message = "✅ **Welcome back!** You're now subscribed to AI newsletter summaries."
+        else:
+            message = "🎉 **Successfully subscribed!** You'll receive AI newsletter summaries tailored for South African professionals."
+        
+        return message
+    
+    def _do_unsubscribe(self, user_id):
+        """Mark a user as inactive"""
+        with self.db.connection() as conn:
+            cursor = conn.execute(
+                'UPDATE subscribers SET is_active = FALSE WHERE user_id = ? AND is_active = TRUE',
+                (user_id,)
+            )
+        self._adjust_subscriber_count(-cursor.rowcount)
+        self.invalidate_subscribers()
+    
+    def _do_status(self, user_id):
+        """Fetch (is_active, subscribed_at) for a user"""
+        with self.db.connection() as conn:
+            cursor = conn.execute('SELECT is_active, subscribed_at FROM subscribers WHERE user_id = ?', (user_id,))
+            return cursor.fetchone()
+    
+    def _do_stats(self):
+        """Fetch active subscriber and recent newsletter counts"""
+        subscriber_count = self.get_subscriber_count()
+        self.flush_newsletter_logs()
+        
+        with self.db.connection() as conn:
+            # Get recent newsletter count
+            cursor = conn.execute('SELECT COUNT(*) FROM newsletter_logs WHERE processed_at > datetime("now", "-7 days")')
+            recent_newsletters = cursor.fetchone()[0]
+        
+        return subscriber_count, recent_newsletters
+    
+    def _count_subscribers(self, conn):
+        """Recount active subscribers on conn and store the result"""
+        cursor = conn.execute('SELECT COUNT(*) FROM subscribers WHERE is_active = TRUE')
+        self.subscriber_count = cursor.fetchone()[0]
+        return self.subscriber_count
+    
+    def _adjust_subscriber_count(self, delta):
+        """Apply a subscribe/unsubscribe to the in-memory count; the refresh job corrects any drift"""
+        with self._count_lock:
+            if self.subscriber_count is not None:
+                self.subscriber_count += delta
+    
+    def refresh_subscriber_count(self):
+        """Reload the active subscriber count from the database"""
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM subscribers WHERE is_active = TRUE')
-            count = cursor.fetchone()[0]
-            conn.close()
-            return count
+            with self.db.connection() as conn:
+                return self._count_subscribers(conn)
         except Exception as e:
             logger.error(f"❌ Error getting subscriber count: {e}")
-            return 0
+            return self.subscriber_count or 0
+    
+    def get_subscriber_count(self):
+        """Get current subscriber count, only querying the database if it was never loaded"""
+        if self.subscriber_count is None:
+            return self.refresh_subscriber_count()
+        return self.subscriber_count
+    
+    def get_active_subscribers(self):
+        """Fetch (user_id, first_name) for every active subscriber, cached for subscriber_cache_ttl seconds"""
+        if self._subscriber_cache is not None:
+            subscribers, cached_at = self._subscriber_cache
+            if time.monotonic() - cached_at < self.subscriber_cache_ttl:
+                return subscribers
+        
+        generation = self._subscriber_gen
+        with self.db.connection() as conn:
+            cursor = conn.execute('SELECT user_id, first_name FROM subscribers WHERE is_active = TRUE')
+            subscribers = cursor.fetchall()
+        if generation == self._subscriber_gen:
+            self._subscriber_cache = (subscribers, time.monotonic())
+        return subscribers
+    
+    def invalidate_subscribers(self):
+        """Drop the cached subscriber list after a subscription change"""
+        self._subscriber_gen += 1
+        self._subscriber_cache = None
     
     def log_newsletter_sent(self, title, subscriber_count, success=True):
-        """Log newsletter processing"""
+        """Queue a newsletter log row; rows are written in batches by flush_newsletter_logs"""
+        with self._log_lock:
+            self._pending_logs.append((title, subscriber_count, success))
+        logger.info(f"📝 Logged newsletter: {title} to {subscriber_count} subscribers")
+    
+    def flush_newsletter_logs(self):
+        """Write all pending newsletter logs in a single transaction"""
+        with self._log_lock:
+            pending, self._pending_logs = self._pending_logs, []
+        
+        if not pending:
+            return
+        
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO newsletter_logs (title, subscribers_count, success)
-                VALUES (?, ?, ?)
-            ''', (title, subscriber_count, success))
-            conn.commit()
-            conn.close()
-            logger.info(f"📝 Logged newsletter: {title} to {subscriber_count} subscribers")
+            with self.db.connection() as conn:
+                conn.executemany('''
+                    INSERT INTO newsletter_logs (title, subscribers_count, success)
+                    VALUES (?, ?, ?)
+                ''', pending)
+            logger.info(f"📝 Flushed {len(pending)} newsletter log(s)")
+        except Exception as e:
+            logger.error(f"❌ Error flushing newsletter logs: {e}")
+            # Put the rows back so the next flush retries them
+            with self._log_lock:
+                self._pending_logs[:0] = pending
+    
+    async def _flush_logs_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job queue callback that flushes pending newsletter logs"""
+        await self.db.run(self.flush_newsletter_logs)
+    
+    async def _refresh_count_job(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job queue callback that picks up subscriber changes made outside the handlers"""
+        await self.db.run(self.refresh_subscriber_count)
+    
+    async def send_message(self, chat_id, text, **kwargs):
+        """Send a message through the shared rate limiter, backing off on flood control"""
+        for attempt in range(self.send_retries):
+            await self.rate_limiter.acquire()
+            try:
+                return await self.app.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.send_retries - 1:
+                    raise
+                logger.warning(f"⏳ Flood control hit, pausing all sends for {e.retry_after}s")
+                self.rate_limiter.pause(e.retry_after)
+    
+    async def start(self):
+        """Start polling on the current event loop (used when embedded in the FastAPI app)"""
+        try:
+            logger.info("🚀 Starting Telegram bot polling...")
+            await self.app.initialize()
+            await self.app.start()
+            await self.app.updater.start_polling(drop_pending_updates=True)
         except Exception as e:
-            logger.error(f"❌ Error logging newsletter: {e}")
+            logger.error(f"❌ Bot polling error: {e}")
+            raise
+    
+    async def stop(self):
+        """Stop polling and shut the application down"""
+        try:
+            if self.app.updater.running:
+                await self.app.updater.stop()
+            if self.app.running:
+                await self.app.stop()
+            await self.app.shutdown()
+            logger.info("🛑 Telegram bot stopped")
+        except Exception as e:
+            logger.error(f"❌ Error stopping bot: {e}")
+    
+    def is_running(self) -> bool:
+        """Check if the bot is polling for updates"""
+        return self.app.running and self.app.updater.running
     
     def run(self):
         """Start the bot with polling"""
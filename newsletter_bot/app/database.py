@@ -0,0 +1,89 @@
+import sqlite3
+import asyncio
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DB_PATH = 'newsletter_bot.db'
+
+class Database:
+    """Small pool of reusable SQLite connections shared by the bot and scheduler"""
+
+    def __init__(self, path: str = DB_PATH, pool_size: int = 8, max_workers: int = 4):
+        self.path = path
+        self.pool_size = pool_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sqlite')
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._created = 0
+        self._lock = threading.Lock()
+        logger.info(f"🗄️ Database pool initialized ({pool_size} connections max)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new pooled connection"""
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.execute('PRAGMA busy_timeout=5000')
+        # Per-connection tuning; journal_mode=WAL itself persists in the file
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-20000')
+        conn.execute('PRAGMA mmap_size=268435456')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Check out an idle connection, opening a new one while under the pool limit"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._created < self.pool_size
+            if can_open:
+                self._created += 1
+
+        if can_open:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        return self._pool.get()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error"""
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking database function on the SQLite thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self):
+        """Shut down the worker threads and close all idle connections"""
+        self.executor.shutdown(wait=True)
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+        logger.info("🗄️ Database pool closed")
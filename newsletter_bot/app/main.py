@@ -1,10 +1,10 @@
-from fastapi import FastAPI, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, BackgroundTasks, Header
+from fastapi.responses import ORJSONResponse
 import asyncio
+import importlib.util
 import logging
 import uvicorn
 from contextlib import asynccontextmanager
-import threading
 import sys
 import os
 
@@ -12,7 +12,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from bot import NewsletterBot
-from newsletter import OpenLetterFetcher
+from newsletter import OpenLetterFetcher, NewsletterFetcher
 from summarizer import NewsletterSummarizer
 from scheduler import NewsletterScheduler
 
@@ -26,26 +26,41 @@ logger = logging.getLogger(__name__)
 # Global instances
 bot_instance = None
 scheduler_instance = None
-bot_thread = None
+fetcher_instance = None
+summarizer_instance = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global bot_instance, scheduler_instance, bot_thread
+    global bot_instance, scheduler_instance, fetcher_instance, summarizer_instance
     
     logger.info("🚀 Starting AI Newsletter Bot SA...")
     
+    # Run new tasks eagerly until their first await (Python 3.12+)
+    if hasattr(asyncio, "eager_task_factory"):
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+    
     try:
         # Initialize components
         bot_instance = NewsletterBot()
-        scheduler_instance = NewsletterScheduler(bot_instance)
+        # Warm the cached subscriber count so /stats never waits on the database
+        await bot_instance.db.run(bot_instance.refresh_subscriber_count)
+        
+        # One OpenLetter fetcher and one summarizer for /trigger-summary and the
+        # scheduled jobs, so they share HTTP connections and the newsletter cache
+        fetcher_instance = OpenLetterFetcher()
+        summarizer_instance = NewsletterSummarizer()
+        scheduler_instance = NewsletterScheduler(
+            bot_instance,
+            fetcher=NewsletterFetcher([fetcher_instance]),
+            summarizer=summarizer_instance
+        )
         
         # Start scheduler
         scheduler_instance.start()
         
-        # Start bot in a separate thread
-        bot_thread = threading.Thread(target=bot_instance.run, daemon=True)
-        bot_thread.start()
+        # Start bot polling on this event loop
+        await bot_instance.start()
         
         logger.info("✅ Bot and scheduler started successfully!")
         
@@ -59,12 +74,21 @@ async def lifespan(app: FastAPI):
         logger.info("🛑 Shutting down...")
         if scheduler_instance:
             scheduler_instance.stop()
+        if fetcher_instance:
+            await fetcher_instance.aclose()
+        if summarizer_instance:
+            await summarizer_instance.aclose()
+        if bot_instance:
+            await bot_instance.stop()
+            bot_instance.flush_newsletter_logs()
+            bot_instance.db.close()
 
 app = FastAPI(
     title="AI Newsletter Bot SA", 
     version="1.0.0",
     description="AI-powered newsletter summarization bot for South African professionals",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 @app.get("/")
@@ -81,12 +105,12 @@ async def health_check():
     """Health check endpoint"""
     try:
         # Check if bot is running
-        bot_status = "running" if bot_instance and bot_thread and bot_thread.is_alive() else "stopped"
+        bot_status = "running" if bot_instance and bot_instance.is_running() else "stopped"
         
         # Check if scheduler is running
-        scheduler_status = "running" if scheduler_instance and scheduler_instance.is_running() else "stopped"
+        scheduler_status = "running" if scheduler_instance and scheduler_instance.is_alive() else "stopped"
         
-        return JSONResponse({
+        return ORJSONResponse({
             "status": "healthy",
             "service": "AI Newsletter Bot SA",
             "components": {
@@ -96,29 +120,29 @@ async def health_check():
         })
     except Exception as e:
         logger.error(f"Health check error: {e}")
-        return JSONResponse(
+        return ORJSONResponse(
             {"status": "unhealthy", "error": str(e)},
             status_code=500
         )
 
 @app.post("/trigger-summary")
-async def trigger_manual_summary():
-    """Manual trigger for testing newsletter processing"""
+async def trigger_manual_summary(x_refresh: bool = Header(False)):
+    """Manual trigger for testing newsletter processing; send X-Refresh: true to bypass the fetch cache"""
     try:
         logger.info("📝 Manual summary trigger requested")
         
-        fetcher = OpenLetterFetcher()
-        summarizer = NewsletterSummarizer()
+        if not fetcher_instance or not summarizer_instance:
+            return {"error": "Fetcher not initialized"}
         
         # Fetch newsletter
         logger.info("📰 Fetching newsletter...")
-        newsletter = fetcher.fetch_latest_newsletter()
+        newsletter = await fetcher_instance.fetch_latest_newsletter(refresh=x_refresh)
         if not newsletter:
             return {"error": "Could not fetch newsletter content"}
         
         # Generate summary
         logger.info("🤖 Generating AI summary...")
-        summary = summarizer.summarize_newsletter(
+        summary = await summarizer_instance.summarize_newsletter(
             newsletter['content'], 
             newsletter['title']
         )
@@ -174,7 +198,7 @@ async def get_stats():
         if not bot_instance:
             return {"error": "Bot not initialized"}
         
-        # Get subscriber count from database
+        # Served from the bot's in-memory count; no database round trip
         subscriber_count = bot_instance.get_subscriber_count()
         
         return {
@@ -187,6 +211,14 @@ async def get_stats():
         logger.error(f"Stats error: {e}")
         return {"error": str(e)}
 
+def server_options():
+    """Pick uvicorn's event loop and HTTP parser, preferring uvloop and httptools when installed"""
+    # uvloop is never installed on Windows (see requirements.txt), so this covers that case too
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    }
+
 if __name__ == "__main__":
     # Run the application
     uvicorn.run(
@@ -194,5 +226,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        **server_options()
     )
\ No newline at end of file
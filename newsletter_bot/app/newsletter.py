@@ -1,14 +1,71 @@
-import requests
+import httpx
 import feedparser
-from bs4 import BeautifulSoup
+from lxml import etree
+from selectolax.parser import HTMLParser
 import re
 from datetime import datetime
+import asyncio
 import logging
 import time
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Cleaned content is capped for the OpenAI token budget; only a margin beyond
+# the cap is worth running the cleaning regexes over
+MAX_CONTENT_LENGTH = 4000
+_PRECLEAN_LENGTH = 2 * MAX_CONTENT_LENGTH
+
+# Response bodies are streamed and cut off at this size
+MAX_DOWNLOAD_BYTES = 2_000_000
+
+# Content cleaning patterns, compiled once
+# HTML tags go in their own pass first, so boilerplate split by inline markup still matches
+_RE_TAGS = re.compile(r'<[^>]+>')
+# Boilerplate, URLs and email addresses stripped in a single pass
+_RE_STRIP = re.compile('|'.join((
+    r'unsubscribe.*?$',
+    r'privacy policy.*?$',
+    r'terms of service.*?$',
+    r'copyright.*?$',
+    r'all rights reserved.*?$',
+    r'subscribe to.*?newsletter',
+    r'follow us on.*?$',
+    r'powered by.*?$',
+    r'https?://\S+',
+    r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
+)), re.IGNORECASE)
+
+# AI keywords for alternative pages; one case-insensitive scan instead of
+# lowercasing the text and searching for each keyword in turn
+_KEYWORD_RE = re.compile(r'ai|artificial intelligence|machine learning|technology', re.IGNORECASE)
+
+# Article-like containers: <article>, <main> or a post/content/entry class
+_CLASS_RE = re.compile(r'(post|content|article|entry)')
+_WEB_TAGS = ('p', 'h1', 'h2', 'title')
+
+# Feed parsing: no entity expansion or network access, namespace-agnostic lookups
+_XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+_FIRST_ENTRY_XPATH = '(//*[local-name()="item"] | //*[local-name()="entry"])[1]'
+
+def _article_container(elem):
+    """Return elem's nearest <article> ancestor, else its nearest article-like container"""
+    container = None
+    for ancestor in elem.iterancestors():
+        if ancestor.tag == 'article':
+            return ancestor
+        if container is None and (ancestor.tag == 'main' or _CLASS_RE.search(ancestor.get('class') or '')):
+            container = ancestor
+    return container
+
+def _entry_text(entry, *names):
+    """Return the text of the first non-empty child element among names"""
+    for name in names:
+        text = entry.xpath(f'string(*[local-name()="{name}"][1])').strip()
+        if text:
+            return text
+    return ""
+
 class OpenLetterFetcher:
     def __init__(self):
         self.base_url = "https://openletter.earth"
@@ -16,29 +73,79 @@ class OpenLetterFetcher:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=10,
+            follow_redirects=True,
+            http2=True
+        )
+        # Validators and result of the last RSS download, for conditional GETs
+        self._etag = None
+        self._modified = None
+        self._last_rss_newsletter = None
+        # Last successful fetch, reused while fresh so back-to-back callers skip the network
+        self.cache_ttl = 600
+        self._cached = (0.0, None)
+        self._cache_lock = asyncio.Lock()
         logger.info("📰 OpenLetter fetcher initialized")
     
-    def fetch_latest_newsletter(self):
+    async def aclose(self):
+        """Close the shared HTTP client"""
+        await self.client.aclose()
+    
+    async def _get(self, url, **kwargs):
+        """Stream a GET response, keeping at most MAX_DOWNLOAD_BYTES of the body"""
+        body = bytearray()
+        async with self.client.stream('GET', url, **kwargs) as response:
+            async for chunk in self._iter_body(url, response):
+                body.extend(chunk)
+        return response, bytes(body)
+    
+    async def _iter_body(self, url, response):
+        """Yield body chunks of a streamed response until MAX_DOWNLOAD_BYTES is reached"""
+        received = 0
+        async for chunk in response.aiter_bytes(64 * 1024):
+            if received + len(chunk) > MAX_DOWNLOAD_BYTES:
+                logger.warning(f"⚠️ Response from {url} exceeds {MAX_DOWNLOAD_BYTES} bytes, truncating")
+                yield chunk[:MAX_DOWNLOAD_BYTES - received]
+                return
+            received += len(chunk)
+            yield chunk
+    
+    async def fetch_latest_newsletter(self, refresh=False):
+        """Fetch the latest OpenLetter newsletter content, reusing a fresh cached result"""
+        async with self._cache_lock:
+            fetched_at, cached = self._cached
+            if cached and not refresh and time.monotonic() - fetched_at < self.cache_ttl:
+                logger.info("📰 Using cached newsletter")
+                return cached
+            
+            content = await self._fetch_latest()
+            if content:
+                self._cached = (time.monotonic(), content)
+            return content
+    
+    async def _fetch_latest(self):
         """Fetch the latest OpenLetter newsletter content"""
         logger.info("🔍 Fetching latest newsletter from OpenLetter...")
         
         try:
             # Try RSS first (most reliable)
-            content = self._fetch_from_rss()
+            content = await self._fetch_from_rss()
             if content:
                 logger.info("✅ Successfully fetched from RSS feed")
                 return content
             
             logger.warning("⚠️ RSS fetch failed, trying web scraping...")
             # Fallback to web scraping
-            content = self._fetch_from_web()
+            content = await self._fetch_from_web()
             if content:
                 logger.info("✅ Successfully fetched from web scraping")
                 return content
             
             logger.warning("⚠️ Web scraping failed, trying alternative approach...")
             # Try alternative scraping
-            content = self._fetch_alternative()
+            content = await self._fetch_alternative()
             if content:
                 logger.info("✅ Successfully fetched from alternative method")
                 return content
@@ -50,106 +157,166 @@ class OpenLetterFetcher:
             logger.error(f"❌ Error fetching newsletter: {e}")
             return None
     
-    def _fetch_from_rss(self):
+    async def _fetch_from_rss(self):
         """Try to fetch from RSS feed"""
         try:
             logger.info("📡 Attempting RSS fetch...")
-            feed = feedparser.parse(self.rss_url)
+            # Download with the client's hard timeout, skipping the body if unchanged
+            headers = {}
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._modified:
+                headers['If-Modified-Since'] = self._modified
             
-            if feed.entries and len(feed.entries) > 0:
-                latest = feed.entries[0]
-                
-                # Extract content
-                content = ""
-                if hasattr(latest, 'content') and latest.content:
-                    content = latest.content[0].value
-                elif hasattr(latest, 'description'):
-                    content = latest.description
-                elif hasattr(latest, 'summary'):
-                    content = latest.summary
+            response, body = await self._get(self.rss_url, headers=headers)
+            if response.status_code == 304:
+                logger.info("📡 RSS feed not modified, reusing last result")
+                return self._last_rss_newsletter
+            response.raise_for_status()
+            
+            self._etag = response.headers.get('ETag')
+            self._modified = response.headers.get('Last-Modified')
+            self._last_rss_newsletter = None
+            
+            try:
+                latest = self._parse_feed(body)
+            except etree.XMLSyntaxError as e:
+                logger.warning(f"⚠️ Feed is not well-formed XML ({e}), falling back to feedparser")
+                latest = await asyncio.to_thread(self._parse_feed_fallback, body)
+            
+            if latest:
+                content = latest['content']
                 
                 if content and len(content) > 100:  # Ensure we have meaningful content
-                    return {
-                        'title': latest.title,
+                    self._last_rss_newsletter = {
+                        'title': latest['title'],
                         'content': self._clean_content(content),
-                        'link': latest.link,
-                        'published': latest.published if hasattr(latest, 'published') else datetime.now().isoformat(),
+                        'link': latest['link'],
+                        'published': latest['published'] or datetime.now().isoformat(),
                         'source': 'rss'
                     }
+                    return self._last_rss_newsletter
                     
         except Exception as e:
             logger.warning(f"⚠️ RSS fetch failed: {e}")
         
         return None
     
-    def _fetch_from_web(self):
+    def _parse_feed(self, body):
+        """Extract the newest RSS item or Atom entry with lxml"""
+        root = etree.fromstring(body, parser=_XML_PARSER)
+        entries = root.xpath(_FIRST_ENTRY_XPATH)
+        if not entries:
+            return None
+        
+        entry = entries[0]
+        return {
+            'title': _entry_text(entry, 'title'),
+            # content:encoded (RSS) / content (Atom) before the shorter description/summary
+            'content': _entry_text(entry, 'encoded', 'content', 'description', 'summary'),
+            # RSS puts the URL in the element text, Atom in its href attribute
+            'link': _entry_text(entry, 'link') or entry.xpath('string(*[local-name()="link"][1]/@href)'),
+            'published': _entry_text(entry, 'pubDate', 'published', 'updated'),
+        }
+    
+    def _parse_feed_fallback(self, body):
+        """Extract the newest entry with feedparser, which tolerates malformed feeds"""
+        feed = feedparser.parse(body)
+        if not feed.entries:
+            return None
+        
+        latest = feed.entries[0]
+        
+        # Extract content
+        content = ""
+        if hasattr(latest, 'content') and latest.content:
+            content = latest.content[0].value
+        elif hasattr(latest, 'description'):
+            content = latest.description
+        elif hasattr(latest, 'summary'):
+            content = latest.summary
+        
+        return {
+            'title': latest.get('title', ''),
+            'content': content,
+            'link': latest.get('link', ''),
+            'published': latest.get('published', ''),
+        }
+    
+    async def _fetch_from_web(self):
         """Fallback web scraping method"""
         try:
             logger.info("🌐 Attempting web scraping...")
-            response = requests.get(self.base_url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            # Paragraphs are pulled out as the page streams in, without building the whole DOM.
+            # Text is grouped by container; the first <article> wins, else the first container found.
+            page_title = None
+            sections = {}
+            article = None
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            def read_events(parser):
+                nonlocal page_title, article
+                for _, elem in parser.read_events():
+                    text = ''.join(elem.itertext()).strip()
+                    if elem.tag == 'title':
+                        page_title = page_title or text
+                    else:
+                        container = _article_container(elem)
+                        if container is not None:
+                            section = sections.setdefault(container, {'title': None, 'parts': [], 'length': 0})
+                            if article is None and container.tag == 'article':
+                                article = container
+                            if elem.tag in ('h1', 'h2'):
+                                section['title'] = section['title'] or text or None
+                            elif len(text) > 20:  # Filter out very short paragraphs
+                                section['parts'].append(text)
+                                section['length'] += len(text) + 1
+                    
+                    # Drop what has been read so the partial tree stays small
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del elem.getparent()[0]
             
-            # Try different selectors for articles
-            article_selectors = [
-                'article',
-                '.post',
-                '.entry',
-                '.content-area article',
-                '[class*="post"]',
-                'main article'
-            ]
+            async with self.client.stream('GET', self.base_url) as response:
+                response.raise_for_status()
+                parser = etree.HTMLPullParser(
+                    events=('end',),
+                    tag=_WEB_TAGS,
+                    encoding=response.charset_encoding or 'utf-8'
+                )
+                async for chunk in self._iter_body(self.base_url, response):
+                    parser.feed(chunk)
+                    read_events(parser)
+                    
+                    # Anything past the pre-clean margin would be trimmed anyway
+                    if article is not None and sections[article]['length'] > _PRECLEAN_LENGTH:
+                        break
             
-            article = None
-            for selector in article_selectors:
-                article = soup.select_one(selector)
-                if article:
-                    logger.info(f"📄 Found article with selector: {selector}")
-                    break
+            # Flush elements still open when the body ended
+            parser.close()
+            read_events(parser)
             
-            if not article:
-                # Try to find main content area
-                article = soup.find('main') or soup.find('div', class_='content')
-                logger.info("📄 Using main content area")
+            if not sections:
+                return None
+            section = sections[article] if article is not None else next(iter(sections.values()))
+            title = section['title']
+            content = ' '.join(section['parts'])
             
-            if article:
-                # Extract title
-                title_selectors = ['h1', 'h2', '.entry-title', '.post-title', 'title']
-                title = "Latest AI Newsletter"
-                
-                for selector in title_selectors:
-                    title_elem = article.find(selector)
-                    if title_elem and title_elem.get_text().strip():
-                        title = title_elem.get_text().strip()
-                        break
-                
-                # Extract content - get all paragraph text
-                paragraphs = article.find_all('p')
-                content_parts = []
-                
-                for p in paragraphs:
-                    text = p.get_text().strip()
-                    if len(text) > 20:  # Filter out very short paragraphs
-                        content_parts.append(text)
-                
-                content = ' '.join(content_parts)
-                
-                if len(content) > 200:  # Ensure we have substantial content
-                    return {
-                        'title': title,
-                        'content': self._clean_content(content),
-                        'link': self.base_url,
-                        'published': datetime.now().isoformat(),
-                        'source': 'web_scraping'
-                    }
+            if len(content) > 200:  # Ensure we have substantial content
+                logger.info("📄 Found article content")
+                return {
+                    'title': title or page_title or "Latest AI Newsletter",
+                    'content': self._clean_content(content),
+                    'link': self.base_url,
+                    'published': datetime.now().isoformat(),
+                    'source': 'web_scraping'
+                }
                     
         except Exception as e:
             logger.warning(f"⚠️ Web scraping failed: {e}")
         
         return None
     
-    def _fetch_alternative(self):
+    async def _fetch_alternative(self):
         """Alternative fetch method - try to get any recent AI content"""
         try:
             logger.info("🔄 Attempting alternative fetch...")
@@ -162,35 +329,68 @@ class OpenLetterFetcher:
                 self.base_url
             ]
             
-            for url in search_urls:
-                try:
-                    response = requests.get(url, headers=self.headers, timeout=10)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        
-                        # Look for any substantial text content
-                        content_areas = soup.find_all(['article', 'div'], class_=re.compile(r'(post|content|article|entry)'))
-                        
-                        for area in content_areas:
-                            text = area.get_text().strip()
-                            if len(text) > 500 and any(keyword in text.lower() for keyword in ['ai', 'artificial intelligence', 'machine learning', 'technology']):
-                                return {
-                                    'title': "Latest AI Content from OpenLetter",
-                                    'content': self._clean_content(text),
-                                    'link': url,
-                                    'published': datetime.now().isoformat(),
-                                    'source': 'alternative'
-                                }
-                                
-                except Exception as e:
-                    logger.warning(f"⚠️ Alternative URL {url} failed: {e}")
-                    continue
-                    
+            # Race the candidates and take the first usable page; the rest are cancelled
+            sem = asyncio.Semaphore(4)
+
+            async def try_url(url):
+                async with sem:
+                    try:
+                        return url, await self._get(url, timeout=5)
+                    except Exception as e:
+                        return url, e
+
+            tasks = [asyncio.create_task(try_url(url)) for url in search_urls]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    url, result = await next_done
+                    if isinstance(result, Exception):
+                        logger.warning(f"⚠️ Alternative URL {url} failed: {result}")
+                        continue
+
+                    try:
+                        newsletter = self._extract_alternative(url, *result)
+                        if newsletter:
+                            return newsletter
+                    except Exception as e:
+                        logger.warning(f"⚠️ Alternative URL {url} failed: {e}")
+                        continue
+            finally:
+                for task in tasks:
+                    task.cancel()
+                # Let the cancelled downloads close their streams before returning
+                await asyncio.gather(*tasks, return_exceptions=True)
+
         except Exception as e:
             logger.warning(f"⚠️ Alternative fetch failed: {e}")
-        
+
         return None
-    
+
+    def _extract_alternative(self, url, response, body):
+        """Pull substantial AI-related text out of an alternative page"""
+        if response.status_code != 200:
+            return None
+
+        tree = HTMLParser(body)
+
+        # Look for any substantial text content
+        content_areas = [
+            node for node in tree.css('article, div')
+            if _CLASS_RE.search(node.attributes.get('class') or '')
+        ]
+
+        for area in content_areas:
+            text = area.text().strip()
+            if len(text) > 500 and _KEYWORD_RE.search(text):
+                return {
+                    'title': "Latest AI Content from OpenLetter",
+                    'content': self._clean_content(text),
+                    'link': url,
+                    'published': datetime.now().isoformat(),
+                    'source': 'alternative'
+                }
+
+        return None
+
     def _clean_content(self, content):
         """Clean and prepare content for summarization"""
         if not content:
@@ -198,40 +398,26 @@ class OpenLetterFetcher:
         
         logger.info("🧹 Cleaning content...")
         
-        # Remove HTML tags
-        content = re.sub(r'<[^>]+>', '', content)
-        
-        # Remove extra whitespace and normalize
-        content = re.sub(r'\s+', ' ', content).strip()
-        
-        # Remove common newsletter/website boilerplate
-        boilerplate_patterns = [
-            r'unsubscribe.*?$',
-            r'privacy policy.*?$',
-            r'terms of service.*?$',
-            r'copyright.*?$',
-            r'all rights reserved.*?$',
-            r'subscribe to.*?newsletter',
-            r'follow us on.*?$',
-            r'powered by.*?$',
-        ]
+        # Remove HTML tags first so the pre-trim margin below is measured in text, not markup
+        content = _RE_TAGS.sub('', content)
         
-        for pattern in boilerplate_patterns:
-            content = re.sub(pattern, '', content, flags=re.IGNORECASE)
+        # Normalize whitespace so boilerplate patterns see a single line
+        content = ' '.join(content.split())
         
-        # Remove URLs (but keep the content around them)
-        content = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', content)
+        if len(content) > _PRECLEAN_LENGTH:
+            content = content[:_PRECLEAN_LENGTH]
+            logger.info(f"📏 Content pre-trimmed to {_PRECLEAN_LENGTH} characters before cleaning")
         
-        # Remove email addresses
-        content = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '', content)
+        # Remove boilerplate, URLs and email addresses
+        content = _RE_STRIP.sub('', content)
         
         # Clean up extra spaces again
-        content = re.sub(r'\s+', ' ', content).strip()
+        content = ' '.join(content.split())
         
         # Limit content length for API efficiency (OpenAI has token limits)
-        if len(content) > 4000:
-            content = content[:4000] + "..."
-            logger.info("📏 Content truncated to 4000 characters")
+        if len(content) > MAX_CONTENT_LENGTH:
+            content = content[:MAX_CONTENT_LENGTH] + "..."
+            logger.info(f"📏 Content truncated to {MAX_CONTENT_LENGTH} characters")
         
         return content
 
@@ -239,7 +425,7 @@ class OpenLetterFetcher:
 class MockNewsletterFetcher:
     """Mock fetcher for testing when OpenLetter is unavailable"""
     
-    def fetch_latest_newsletter(self):
+    async def fetch_latest_newsletter(self):
         """Return mock newsletter content for testing"""
         logger.info("🧪 Using mock newsletter content for testing")
         
@@ -270,14 +456,20 @@ class MockNewsletterFetcher:
 class NewsletterFetcher:
     """Main newsletter fetcher that tries multiple sources"""
     
-    def __init__(self):
-        self.fetchers = [
+    def __init__(self, fetchers=None):
+        # Callers may pass fetchers they share elsewhere, so their caches and connections are reused
+        self.fetchers = fetchers or [
             OpenLetterFetcher(),
         ]
         self.mock_fetcher = MockNewsletterFetcher()
         logger.info("📰 Newsletter fetcher initialized with multiple sources")
     
-    def fetch_latest_newsletter(self):
+    async def aclose(self):
+        """Close HTTP clients held by the underlying fetchers"""
+        for fetcher in self.fetchers:
+            await fetcher.aclose()
+    
+    async def fetch_latest_newsletter(self, refresh=False):
         """Fetch newsletter from available sources"""
         logger.info("🔍 Starting newsletter fetch from multiple sources...")
         
@@ -285,7 +477,7 @@ class NewsletterFetcher:
         for i, fetcher in enumerate(self.fetchers):
             try:
                 logger.info(f"📡 Trying fetcher {i+1}/{len(self.fetchers)}...")
-                content = fetcher.fetch_latest_newsletter()
+                content = await fetcher.fetch_latest_newsletter(refresh=refresh)
                 if content and content['content'] and len(content['content']) > 100:
                     logger.info(f"✅ Successfully fetched from source {i+1}")
                     return content
@@ -295,15 +487,21 @@ class NewsletterFetcher:
         
         logger.warning("⚠️ All main fetchers failed, using mock content for testing")
         # If all else fails, return mock content so the system can still be tested
-        return self.mock_fetcher.fetch_latest_newsletter()
+        return await self.mock_fetcher.fetch_latest_newsletter()
 
 
 if __name__ == "__main__":
     # Test the fetcher
     logging.basicConfig(level=logging.INFO)
     
-    fetcher = NewsletterFetcher()
-    content = fetcher.fetch_latest_newsletter()
+    async def fetch_once():
+        fetcher = NewsletterFetcher()
+        try:
+            return await fetcher.fetch_latest_newsletter()
+        finally:
+            await fetcher.aclose()
+    
+    content = asyncio.run(fetch_once())
     
     if content:
         print("✅ Test successful!")
@@ -2,8 +2,7 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 import asyncio
 import logging
-import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import sys
 import os
 
@@ -16,13 +15,50 @@ from summarizer import NewsletterSummarizer
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Broadcast message templates
+_WEEKLY_TEMPLATE = """
+📊 **Weekly AI Newsletter Update**
+
+This week with AI Newsletter Bot SA:
+
+📰 **Newsletters processed:** {newsletters}
+👥 **Active community:** {subscribers} South African professionals
+🤖 **AI summaries delivered:** {newsletters}
+
+**Coming up:**
+🔄 Fresh AI insights next week
+💡 New features in development
+🚀 More South African AI sources being added
+
+**Feedback welcome!** Reply to this message with your thoughts or suggestions.
+
+🇿🇦 *Proudly serving South African AI professionals*
+⚡ *Powered by AI Newsletter Bot SA*
+"""
+
+_TEST_TEMPLATE = """
+🧪 **Test Message - {now:%H:%M}**
+
+This is an automated test message to verify the scheduler is working.
+
+⏰ Time: {now:%Y-%m-%d %H:%M:%S} SAST
+🤖 Status: All systems operational
+📱 Delivery: Successful
+
+*This is a test message and can be ignored.*
+"""
+
 class NewsletterScheduler:
-    def __init__(self, bot_instance):
+    def __init__(self, bot_instance, fetcher=None, summarizer=None):
         self.scheduler = AsyncIOScheduler()
         self.bot = bot_instance
-        self.fetcher = NewsletterFetcher()
-        self.summarizer = NewsletterSummarizer()
-        self.is_running = False
+        self.fetcher = fetcher or NewsletterFetcher()
+        self.summarizer = summarizer or NewsletterSummarizer()
+        self._is_running = False
+        # Sends in flight at once; the bot's rate limiter still caps messages per second
+        self.send_concurrency = 20
+        # UTC date of the last successful run, matching SQLite's date('now')
+        self._processed_date = None
         logger.info("📅 Newsletter scheduler initialized")
     
     def start(self):
@@ -59,7 +95,7 @@ class NewsletterScheduler:
             # )
             
             self.scheduler.start()
-            self.is_running = True
+            self._is_running = True
             logger.info("✅ Newsletter scheduler started successfully")
             logger.info("📅 Daily processing: 9:00 AM SAST")
             logger.info("📅 Weekly summary: Friday 5:00 PM SAST")
@@ -73,14 +109,14 @@ class NewsletterScheduler:
         try:
             if self.scheduler.running:
                 self.scheduler.shutdown()
-            self.is_running = False
+            self._is_running = False
             logger.info("🛑 Newsletter scheduler stopped")
         except Exception as e:
             logger.error(f"❌ Error stopping scheduler: {e}")
     
-    def is_running(self) -> bool:
+    def is_alive(self) -> bool:
         """Check if scheduler is running"""
-        return self.is_running and self.scheduler.running
+        return self._is_running and self.scheduler.running
     
     async def process_and_send_newsletter(self):
         """Main function: Process latest newsletter and send to subscribers"""
@@ -88,13 +124,13 @@ class NewsletterScheduler:
         
         try:
             # Check if we already processed a newsletter today
-            if self._already_processed_today():
+            if await self.bot.db.run(self._already_processed_today):
                 logger.info("ℹ️ Newsletter already processed today, skipping")
                 return
             
             # Fetch newsletter content
             logger.info("📰 Fetching latest newsletter...")
-            newsletter = self.fetcher.fetch_latest_newsletter()
+            newsletter = await self.fetcher.fetch_latest_newsletter()
             
             if not newsletter:
                 logger.warning("⚠️ No newsletter content found")
@@ -105,7 +141,7 @@ class NewsletterScheduler:
             
             # Generate AI summary
             logger.info("🤖 Generating AI summary...")
-            summary = self.summarizer.summarize_newsletter(
+            summary = await self.summarizer.summarize_newsletter(
                 newsletter['content'],
                 newsletter['title']
             )
@@ -129,6 +165,9 @@ class NewsletterScheduler:
             
             # Log the successful processing
             self.bot.log_newsletter_sent(newsletter['title'], subscriber_count, True)
+            # Write the success row now; it is what stops a restart from sending again today
+            await self.bot.db.run(self.bot.flush_newsletter_logs)
+            self._processed_date = datetime.now(timezone.utc).date()
             
             logger.info(f"🎉 Newsletter processed and sent to {subscriber_count} subscribers")
             
@@ -139,8 +178,8 @@ class NewsletterScheduler:
             # Log the failed processing
             try:
                 self.bot.log_newsletter_sent("Processing Failed", 0, False)
-            except:
-                pass
+            except Exception as log_error:
+                logger.error(f"❌ Could not log failed processing: {log_error}")
     
     async def send_weekly_summary(self):
         """Send weekly summary message"""
@@ -148,37 +187,12 @@ class NewsletterScheduler:
         
         try:
             # Get stats for the week
-            subscriber_count = self.bot.get_subscriber_count()
+            newsletters_this_week, subscriber_count = await self.bot.db.run(self._get_weekly_stats)
             
-            # Get newsletters processed this week
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT COUNT(*) FROM newsletter_logs 
-                WHERE processed_at > datetime('now', '-7 days') AND success = TRUE
-            ''')
-            newsletters_this_week = cursor.fetchone()[0]
-            conn.close()
-            
-            weekly_message = f"""
-📊 **Weekly AI Newsletter Update**
-
-This week with AI Newsletter Bot SA:
-
-📰 **Newsletters processed:** {newsletters_this_week}
-👥 **Active community:** {subscriber_count} South African professionals
-🤖 **AI summaries delivered:** {newsletters_this_week}
-
-**Coming up:**
-🔄 Fresh AI insights next week
-💡 New features in development
-🚀 More South African AI sources being added
-
-**Feedback welcome!** Reply to this message with your thoughts or suggestions.
-
-🇿🇦 *Proudly serving South African AI professionals*
-⚡ *Powered by AI Newsletter Bot SA*
-            """
+            weekly_message = _WEEKLY_TEMPLATE.format(
+                newsletters=newsletters_this_week,
+                subscribers=subscriber_count
+            )
             
             sent_count = await self.send_to_subscribers(weekly_message)
             logger.info(f"📊 Weekly summary sent to {sent_count} subscribers")
@@ -190,17 +204,7 @@ This week with AI Newsletter Bot SA:
         """Send a test message (for debugging)"""
         logger.info("🧪 Sending test message...")
         
-        test_message = f"""
-🧪 **Test Message - {datetime.now().strftime('%H:%M')}**
-
-This is an automated test message to verify the scheduler is working.
-
-⏰ Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S SAST')}
-🤖 Status: All systems operational
-📱 Delivery: Successful
-
-*This is a test message and can be ignored.*
-        """
+        test_message = _TEST_TEMPLATE.format(now=datetime.now())
         
         try:
             sent_count = await self.send_to_subscribers(test_message)
@@ -214,50 +218,56 @@ This is an automated test message to verify the scheduler is working.
         
         try:
             # Get all active subscribers
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('SELECT user_id, first_name FROM subscribers WHERE is_active = TRUE')
-            subscribers = cursor.fetchall()
-            conn.close()
+            subscribers = await self.bot.db.run(self.bot.get_active_subscribers)
             
             if not subscribers:
                 logger.warning("⚠️ No active subscribers found")
                 return 0
             
-            successful_sends = 0
-            failed_sends = 0
-            
             logger.info(f"📤 Sending to {len(subscribers)} subscribers...")
             
-            for user_id, first_name in subscribers:
-                try:
-                    await self.bot.app.bot.send_message(
-                        chat_id=user_id,
-                        text=message,
-                        parse_mode='Markdown',
-                        disable_web_page_preview=True
-                    )
-                    successful_sends += 1
-                    logger.debug(f"✅ Sent to {first_name} ({user_id})")
-                    
-                    # Rate limiting - respect Telegram limits
-                    await asyncio.sleep(0.05)  # 20 messages per second max
-                    
-                except Exception as e:
-                    failed_sends += 1
-                    error_msg = str(e).lower()
-                    
-                    # Handle specific Telegram errors
-                    if 'blocked' in error_msg or 'user is deactivated' in error_msg:
-                        logger.info(f"👋 User {first_name} ({user_id}) blocked the bot, deactivating")
-                        self._deactivate_user(user_id)
-                    elif 'chat not found' in error_msg:
-                        logger.info(f"👻 Chat not found for {first_name} ({user_id}), deactivating")
-                        self._deactivate_user(user_id)
-                    else:
-                        logger.warning(f"⚠️ Failed to send to {first_name} ({user_id}): {e}")
-                    
-                    await asyncio.sleep(0.1)  # Longer pause after error
+            sem = asyncio.Semaphore(self.send_concurrency)
+            deactivate_ids = []
+            
+            async def send(user_id, first_name):
+                async with sem:
+                    try:
+                        await self.bot.send_message(
+                            chat_id=user_id,
+                            text=message,
+                            parse_mode='Markdown',
+                            disable_web_page_preview=True
+                        )
+                        logger.debug(f"✅ Sent to {first_name} ({user_id})")
+                        return True
+                        
+                    except Exception as e:
+                        error_msg = str(e).lower()
+                        
+                        # Handle specific Telegram errors
+                        if 'blocked' in error_msg or 'user is deactivated' in error_msg:
+                            logger.info(f"👋 User {first_name} ({user_id}) blocked the bot, deactivating")
+                            deactivate_ids.append(user_id)
+                        elif 'chat not found' in error_msg:
+                            logger.info(f"👻 Chat not found for {first_name} ({user_id}), deactivating")
+                            deactivate_ids.append(user_id)
+                        else:
+                            logger.warning(f"⚠️ Failed to send to {first_name} ({user_id}): {e}")
+                        return False
+            
+            # One unexpected failure must not abort the rest of the broadcast
+            results = await asyncio.gather(
+                *(send(user_id, first_name) for user_id, first_name in subscribers),
+                return_exceptions=True
+            )
+            for (user_id, first_name), result in zip(subscribers, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"❌ Unexpected error sending to {first_name} ({user_id}): {result!r}")
+            successful_sends = sum(1 for result in results if result is True)
+            failed_sends = len(results) - successful_sends
+            
+            if deactivate_ids:
+                await self.bot.db.run(self._deactivate_users, deactivate_ids)
             
             logger.info(f"📊 Broadcast complete: {successful_sends} sent, {failed_sends} failed")
             return successful_sends
@@ -266,29 +276,49 @@ This is an automated test message to verify the scheduler is working.
             logger.error(f"❌ Broadcast error: {e}")
             return 0
     
-    def _deactivate_user(self, user_id: int):
-        """Deactivate a user who blocked the bot"""
+    def _get_weekly_stats(self):
+        """Fetch (successful newsletters in the last seven days, active subscribers) in one query"""
+        self.bot.flush_newsletter_logs()
+        with self.bot.db.connection() as conn:
+            cursor = conn.execute('''
+                SELECT
+                    (SELECT COUNT(*) FROM newsletter_logs 
+                     WHERE processed_at > datetime('now', '-7 days') AND success = TRUE),
+                    (SELECT COUNT(*) FROM subscribers WHERE is_active = TRUE)
+            ''')
+            return cursor.fetchone()
+    
+    def _deactivate_users(self, user_ids: list):
+        """Deactivate users who blocked the bot in a single transaction"""
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('UPDATE subscribers SET is_active = FALSE WHERE user_id = ?', (user_id,))
-            conn.commit()
-            conn.close()
-            logger.info(f"🚫 Deactivated user {user_id}")
+            with self.bot.db.connection() as conn:
+                conn.executemany(
+                    'UPDATE subscribers SET is_active = FALSE WHERE user_id = ?',
+                    [(user_id,) for user_id in user_ids]
+                )
+            logger.info(f"🚫 Deactivated {len(user_ids)} user(s)")
+            self.bot.invalidate_subscribers()
+            self.bot.refresh_subscriber_count()
         except Exception as e:
-            logger.error(f"❌ Error deactivating user {user_id}: {e}")
+            logger.error(f"❌ Error deactivating users {user_ids}: {e}")
     
     def _already_processed_today(self) -> bool:
         """Check if we already processed a newsletter today"""
+        today = datetime.now(timezone.utc).date()
+        if self._processed_date == today:
+            return True
+        
         try:
-            conn = sqlite3.connect('newsletter_bot.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT COUNT(*) FROM newsletter_logs 
-                WHERE date(processed_at) = date('now') AND success = TRUE
-            ''')
-            count = cursor.fetchone()[0]
-            conn.close()
+            self.bot.flush_newsletter_logs()
+            with self.bot.db.connection() as conn:
+                cursor = conn.execute('''
+                    SELECT COUNT(*) FROM newsletter_logs 
+                    WHERE processed_at >= date('now') AND processed_at < date('now', '+1 day')
+                    AND success = TRUE
+                ''')
+                count = cursor.fetchone()[0]
+            if count > 0:
+                self._processed_date = today
             return count > 0
         except Exception as e:
             logger.error(f"❌ Error checking today's processing: {e}")
@@ -361,9 +391,15 @@ if __name__ == "__main__":
         def log_newsletter_sent(self, title, count, success):
             print(f"Mock log: {title}, {count} users, success: {success}")
         
+        def flush_newsletter_logs(self):
+            pass
+        
         def get_subscriber_count(self):
             return 5
         
+        async def send_message(self, chat_id, text, **kwargs):
+            await self.app.bot.send_message(chat_id, text, **kwargs)
+        
         class MockApp:
             class MockBot:
                 async def send_message(self, chat_id, text, **kwargs):
@@ -378,7 +414,7 @@ if __name__ == "__main__":
     scheduler = NewsletterScheduler(mock_bot)
     
     print("✅ Scheduler test successful!")
-    print(f"📅 Scheduler running: {scheduler.is_running}")
+    print(f"📅 Scheduler running: {scheduler.is_alive()}")
     
     # Test job scheduling
     next_runs = scheduler.get_next_run_time()
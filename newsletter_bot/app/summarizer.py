@@ -1,8 +1,9 @@
 import openai
 import os
 from dotenv import load_dotenv
+import asyncio
 import logging
-import time
+import re
 from typing import Optional
 
 load_dotenv()
@@ -10,6 +11,61 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Telegram message frame; the summary is cut to whatever room is left under the limit.
+# Telegram counts UTF-16 code units, so emoji outside the BMP take two.
+MAX_MESSAGE_LENGTH = 4000
+_HEADER = "🤖 **AI Newsletter Summary**\n\n"
+_FOOTER = "\n\n🇿🇦 *Curated for South African professionals*\n⚡ *Powered by AI Newsletter Bot SA*"
+
+def _utf16_len(text: str) -> int:
+    """Length of text as Telegram measures it"""
+    return len(text.encode('utf-16-le')) // 2
+
+_FRAME_LENGTH = _utf16_len(_HEADER) + _utf16_len(_FOOTER)
+
+# Summarization prompt, filled in per newsletter
+_PROMPT_TEMPLATE = """
+Please summarize this AI newsletter content for South African professionals and business owners. 
+
+FOCUS ON:
+- Actionable AI tools and techniques that can be implemented immediately
+- Practical applications specifically relevant to South African businesses
+- Cost-effective solutions suitable for local market conditions
+- ROI potential and implementation complexity
+- Local regulatory or market considerations where applicable
+
+NEWSLETTER TITLE: {title}
+
+CONTENT: {content}
+
+INSTRUCTIONS:
+1. Create a concise summary with 4-6 key bullet points
+2. Each point should be actionable and specific
+3. Include costs, implementation difficulty, or timeframes where mentioned
+4. Highlight tools or strategies particularly suitable for SMEs
+5. Use South African business terminology where appropriate (e.g., "SME" not "small business")
+6. If relevant, mention compatibility with local systems or regulations
+
+FORMAT:
+- Start with a one-sentence overview
+- Follow with bullet points (use • not numbers)
+- End with a practical next step or key takeaway
+- Keep total length under 400 words
+- Write in a professional but accessible tone
+
+AVOID:
+- Generic statements without actionable value
+- Technical jargon without explanation
+- US-specific references or costs in USD without context
+- Overly promotional language
+"""
+
+# "- ", "* " or "•" list markers at the start of a line, normalized to "• " in one pass
+_BULLET_RE = re.compile(r'^[ \t]*(?:[-*] |•)[ \t]*', re.MULTILINE)
+
+# Keywords that make a sentence worth keeping in the fallback summary
+_KW_RE = re.compile(r'ai|artificial intelligence|business|tool|cost|efficiency|automation|productivity', re.IGNORECASE)
+
 class NewsletterSummarizer:
     def __init__(self):
         self.api_key = os.getenv('OPENAI_API_KEY')
@@ -17,12 +73,16 @@ class NewsletterSummarizer:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
         
         openai.api_key = self.api_key
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.client = openai.AsyncOpenAI(api_key=self.api_key)
         self.model = "gpt-3.5-turbo"
         self.max_retries = 3
         logger.info("🤖 AI Summarizer initialized with OpenAI")
     
-    def summarize_newsletter(self, content: str, title: str = "") -> Optional[str]:
+    async def aclose(self):
+        """Close the OpenAI HTTP client"""
+        await self.client.close()
+    
+    async def summarize_newsletter(self, content: str, title: str = "") -> Optional[str]:
         """Summarize newsletter content with South African context"""
         logger.info("🧠 Generating AI summary...")
         
@@ -38,7 +98,7 @@ class NewsletterSummarizer:
                 try:
                     logger.info(f"📡 OpenAI API call attempt {attempt + 1}/{self.max_retries}")
                     
-                    response = self.client.chat.completions.create(
+                    response = await self.client.chat.completions.create(
                         model=self.model,
                         messages=[
                             {
@@ -68,7 +128,7 @@ class NewsletterSummarizer:
                 except openai.RateLimitError as e:
                     logger.warning(f"⚠️ Rate limit hit, waiting before retry {attempt + 1}")
                     if attempt < self.max_retries - 1:
-                        time.sleep(2 ** attempt)  # Exponential backoff
+                        await asyncio.sleep(2 ** attempt)  # Exponential backoff
                         continue
                     else:
                         logger.error("❌ Rate limit exceeded, using fallback")
@@ -77,7 +137,7 @@ class NewsletterSummarizer:
                 except openai.APIError as e:
                     logger.warning(f"⚠️ OpenAI API error: {e}")
                     if attempt < self.max_retries - 1:
-                        time.sleep(1)
+                        await asyncio.sleep(1)
                         continue
                     else:
                         logger.error("❌ API error, using fallback")
@@ -86,7 +146,7 @@ class NewsletterSummarizer:
                 except Exception as e:
                     logger.warning(f"⚠️ Unexpected error on attempt {attempt + 1}: {e}")
                     if attempt < self.max_retries - 1:
-                        time.sleep(1)
+                        await asyncio.sleep(1)
                         continue
                     else:
                         logger.error("❌ All attempts failed, using fallback")
@@ -98,42 +158,7 @@ class NewsletterSummarizer:
     
     def _create_prompt(self, content: str, title: str) -> str:
         """Create optimized prompt for South African context"""
-        prompt = f"""
-Please summarize this AI newsletter content for South African professionals and business owners. 
-
-FOCUS ON:
-- Actionable AI tools and techniques that can be implemented immediately
-- Practical applications specifically relevant to South African businesses
-- Cost-effective solutions suitable for local market conditions
-- ROI potential and implementation complexity
-- Local regulatory or market considerations where applicable
-
-NEWSLETTER TITLE: {title}
-
-CONTENT: {content}
-
-INSTRUCTIONS:
-1. Create a concise summary with 4-6 key bullet points
-2. Each point should be actionable and specific
-3. Include costs, implementation difficulty, or timeframes where mentioned
-4. Highlight tools or strategies particularly suitable for SMEs
-5. Use South African business terminology where appropriate (e.g., "SME" not "small business")
-6. If relevant, mention compatibility with local systems or regulations
-
-FORMAT:
-- Start with a one-sentence overview
-- Follow with bullet points (use • not numbers)
-- End with a practical next step or key takeaway
-- Keep total length under 400 words
-- Write in a professional but accessible tone
-
-AVOID:
-- Generic statements without actionable value
-- Technical jargon without explanation
-- US-specific references or costs in USD without context
-- Overly promotional language
-"""
-        return prompt
+        return _PROMPT_TEMPLATE.format(title=title, content=content)
     
     def _format_summary(self, summary: str, title: str) -> str:
         """Format summary for Telegram with proper styling"""
@@ -143,38 +168,21 @@ AVOID:
         summary = summary.strip()
         
         # Ensure bullet points are properly formatted
-        summary = summary.replace('•', '•')
-        summary = summary.replace('- ', '• ')
-        summary = summary.replace('* ', '• ')
-        
-        # Format the final message
-        formatted = f"🤖 **AI Newsletter Summary**\n\n"
+        summary = _BULLET_RE.sub('• ', summary)
         
-        if title and title.strip():
-            formatted += f"📰 **{title.strip()}**\n\n"
+        title = title.strip() if title else ""
+        title_line = f"📰 **{title}**\n\n" if title else ""
         
-        formatted += f"{summary}\n\n"
-        formatted += f"🇿🇦 *Curated for South African professionals*\n"
-        formatted += f"⚡ *Powered by AI Newsletter Bot SA*"
-        
-        # Ensure message isn't too long for Telegram (4096 char limit)
-        if len(formatted) > 4000:
-            # Truncate the summary part while keeping headers and footers
-            header_length = len("🤖 **AI Newsletter Summary**\n\n📰 **") + len(title) + len("**\n\n")
-            footer_length = len("\n\n🇿🇦 *Curated for South African professionals*\n⚡ *Powered by AI Newsletter Bot SA*")
-            available_length = 4000 - header_length - footer_length
-            
-            summary = summary[:available_length] + "..."
-            formatted = f"🤖 **AI Newsletter Summary**\n\n"
-            if title:
-                formatted += f"📰 **{title.strip()}**\n\n"
-            formatted += f"{summary}\n\n"
-            formatted += f"🇿🇦 *Curated for South African professionals*\n"
-            formatted += f"⚡ *Powered by AI Newsletter Bot SA*"
-            
+        # Ensure message isn't too long for Telegram (4096 UTF-16 unit limit)
+        # A title longer than the budget leaves no room, not a negative cut
+        available_length = max(0, MAX_MESSAGE_LENGTH - _FRAME_LENGTH - _utf16_len(title_line))
+        encoded = summary.encode('utf-16-le')
+        if len(encoded) // 2 > available_length:
+            # Cut on a code-unit boundary; a split surrogate pair is dropped on decode
+            summary = encoded[:2 * max(0, available_length - 3)].decode('utf-16-le', errors='ignore') + "..."
             logger.info("📏 Summary truncated to fit Telegram limits")
         
-        return formatted
+        return f"{_HEADER}{title_line}{summary}{_FOOTER}"
     
     def _create_fallback_summary(self, content: str, title: str) -> str:
         """Create a basic fallback summary when AI fails"""
@@ -185,11 +193,9 @@ AVOID:
         key_sentences = []
         
         # Look for sentences with important keywords
-        keywords = ['AI', 'artificial intelligence', 'business', 'tool', 'cost', 'efficiency', 'automation', 'productivity']
-        
         for sentence in sentences[:10]:  # Only check first 10 sentences
             sentence = sentence.strip()
-            if len(sentence) > 20 and any(keyword.lower() in sentence.lower() for keyword in keywords):
+            if len(sentence) > 20 and _KW_RE.search(sentence):
                 key_sentences.append(sentence + '.')
                 if len(key_sentences) >= 3:
                     break
@@ -210,12 +216,12 @@ AVOID:
         
         return self._format_summary(fallback_content, title or "AI Newsletter Update")
     
-    def test_connection(self) -> bool:
+    async def test_connection(self) -> bool:
         """Test OpenAI API connection"""
         try:
             logger.info("🧪 Testing OpenAI API connection...")
             
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "user", "content": "Test message. Please respond with 'Connection successful.'"}
@@ -238,7 +244,7 @@ AVOID:
 class MockSummarizer:
     """Mock summarizer for testing when OpenAI is unavailable"""
     
-    def summarize_newsletter(self, content: str, title: str = "") -> str:
+    async def summarize_newsletter(self, content: str, title: str = "") -> str:
         """Return a mock summary for testing"""
         logger.info("🧪 Using mock summarizer for testing")
         
@@ -261,7 +267,7 @@ class MockSummarizer:
         
         return mock_summary.strip()
     
-    def test_connection(self) -> bool:
+    async def test_connection(self) -> bool:
         """Mock connection test"""
         return True
 
@@ -277,30 +283,34 @@ if __name__ == "__main__":
     OpenAI has released new features that reduce costs by 40%. Local businesses are implementing AI solutions.
     """
     
-    try:
+    async def run_test():
         summarizer = NewsletterSummarizer()
-        
-        # Test connection first
-        if summarizer.test_connection():
-            print("✅ OpenAI connection test passed")
-            
-            # Test summarization
-            summary = summarizer.summarize_newsletter(test_content, "Test AI Newsletter")
-            if summary:
-                print("✅ Summarization test successful!")
-                print("\nGenerated Summary:")
-                print(summary)
+        try:
+            # Test connection first
+            if await summarizer.test_connection():
+                print("✅ OpenAI connection test passed")
+                
+                # Test summarization
+                summary = await summarizer.summarize_newsletter(test_content, "Test AI Newsletter")
+                if summary:
+                    print("✅ Summarization test successful!")
+                    print("\nGenerated Summary:")
+                    print(summary)
+                else:
+                    print("❌ Summarization test failed")
             else:
-                print("❌ Summarization test failed")
-        else:
-            print("❌ OpenAI connection test failed")
-            
+                print("❌ OpenAI connection test failed")
+        finally:
+            await summarizer.aclose()
+    
+    try:
+        asyncio.run(run_test())
     except Exception as e:
         print(f"❌ Test failed with error: {e}")
         print("🧪 Testing mock summarizer instead...")
         
         mock = MockSummarizer()
-        summary = mock.summarize_newsletter(test_content, "Test AI Newsletter")
+        summary = asyncio.run(mock.summarize_newsletter(test_content, "Test AI Newsletter"))
         print("✅ Mock summarizer test successful!")
         print("\nMock Summary:")
         print(summary)
\ No newline at end of file
@@ -5,8 +5,8 @@ Simple launcher script for AI Newsletter Bot SA
 
 import os
 import sys
-import subprocess
 import logging
+from importlib.metadata import distribution, PackageNotFoundError
 
 # Add the app directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
@@ -14,11 +14,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
 def check_environment():
     """Check if required environment variables are set"""
     required_vars = ['TELEGRAM_BOT_TOKEN', 'OPENAI_API_KEY']
-    missing_vars = []
-    
-    for var in required_vars:
-        if not os.getenv(var):
-            missing_vars.append(var)
+    missing_vars = [var for var in required_vars if not os.environ.get(var)]
     
     if missing_vars:
         print("❌ Missing required environment variables:")
@@ -31,19 +27,33 @@ def check_environment():
 
 def check_dependencies():
     """Check if required dependencies are installed"""
-    try:
-        import fastapi
-        import uvicorn
-        import telegram
-        import openai
-        import requests
-        import beautifulsoup4
-        import apscheduler
-        return True
-    except ImportError as e:
-        print(f"❌ Missing dependency: {e}")
+    # Look up installed distributions instead of importing them, which is much slower
+    required_packages = [
+        'fastapi', 'orjson', 'uvicorn', 'python-telegram-bot', 'h2', 'openai', 'httpx',
+        'selectolax', 'lxml', 'feedparser', 'apscheduler', 'python-dotenv'
+    ]
+    # Speedups only; the server falls back to asyncio and h11 without them
+    optional_packages = ['uvloop', 'httptools']
+    
+    def is_installed(package):
+        try:
+            distribution(package)
+            return True
+        except PackageNotFoundError:
+            return False
+    
+    missing_packages = [package for package in required_packages if not is_installed(package)]
+    missing_optional = [package for package in optional_packages if not is_installed(package)]
+    
+    if missing_optional:
+        print(f"⚠️ Optional speedups not installed: {', '.join(missing_optional)}")
+    
+    if missing_packages:
+        print(f"❌ Missing dependencies: {', '.join(missing_packages)}")
         print("\n💡 Run: pip install -r requirements.txt")
         return False
+    
+    return True
 
 def run_bot():
     """Run the bot application"""
@@ -57,15 +67,16 @@ def run_bot():
     
     try:
         # Import and run the main application
-        from app.main import app
+        from app.main import app, server_options
         import uvicorn
         
-        # Run with uvicorn
+        # Run with uvicorn, on uvloop and httptools when installed
         uvicorn.run(
             app,
             host="0.0.0.0",
             port=8000,
-            log_level="info"
+            log_level="info",
+            **server_options()
         )
         
     except KeyboardInterrupt:
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+import unittest
+
+# The app modules import each other by bare name
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from lxml import etree
+
+from newsletter import OpenLetterFetcher, MAX_CONTENT_LENGTH, _RE_STRIP
+
+RSS_FEED = b"""<?xml version="1.0"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+  <channel>
+    <item>
+      <title>Newest issue</title>
+      <link>https://openletter.earth/newest</link>
+      <pubDate>Mon, 02 Oct 2023 08:00:00 GMT</pubDate>
+      <description>Short teaser</description>
+      <content:encoded><![CDATA[<p>Full newsletter body</p>]]></content:encoded>
+    </item>
+    <item>
+      <title>Older issue</title>
+    </item>
+  </channel>
+</rss>"""
+
+ATOM_FEED = b"""<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <title>Atom issue</title>
+    <link href="https://openletter.earth/atom"/>
+    <updated>2023-10-02T08:00:00Z</updated>
+    <summary>Atom summary</summary>
+  </entry>
+</feed>"""
+
+class FetcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fetcher = OpenLetterFetcher()
+
+    def tearDown(self):
+        asyncio.run(self.fetcher.aclose())
+
+class ParseFeedTest(FetcherTestCase):
+    def test_rss_takes_first_item_and_full_content(self):
+        entry = self.fetcher._parse_feed(RSS_FEED)
+        self.assertEqual(entry, {
+            'title': 'Newest issue',
+            'content': '<p>Full newsletter body</p>',
+            'link': 'https://openletter.earth/newest',
+            'published': 'Mon, 02 Oct 2023 08:00:00 GMT',
+        })
+
+    def test_atom_reads_link_href_and_summary(self):
+        entry = self.fetcher._parse_feed(ATOM_FEED)
+        self.assertEqual(entry['title'], 'Atom issue')
+        self.assertEqual(entry['content'], 'Atom summary')
+        self.assertEqual(entry['link'], 'https://openletter.earth/atom')
+        self.assertEqual(entry['published'], '2023-10-02T08:00:00Z')
+
+    def test_empty_feed_returns_none(self):
+        self.assertIsNone(self.fetcher._parse_feed(b"<rss><channel></channel></rss>"))
+
+    def test_malformed_feed_raises_for_fallback(self):
+        with self.assertRaises(etree.XMLSyntaxError):
+            self.fetcher._parse_feed(b"<rss><channel><item>")
+
+class CleanContentTest(FetcherTestCase):
+    def test_strips_tags_urls_emails_and_boilerplate(self):
+        content = (
+            "<p>AI tools for SMEs</p> see https://example.com/x or mail news@example.co.za "
+            "Subscribe to our weekly newsletter today"
+        )
+        self.assertEqual(self.fetcher._clean_content(content), "AI tools for SMEs see or mail today")
+
+    def test_trailing_boilerplate_is_removed_to_end(self):
+        self.assertEqual(self.fetcher._clean_content("Useful text\n\nUnsubscribe here | Privacy"), "Useful text")
+
+    def test_boilerplate_split_by_inline_markup(self):
+        self.assertEqual(self.fetcher._clean_content("Great read. Unsub<b>scribe</b> here"), "Great read.")
+
+    def test_boilerplate_pass_leaves_plain_text(self):
+        self.assertEqual(_RE_STRIP.sub('', 'AI for SMEs'), 'AI for SMEs')
+
+    def test_long_content_is_capped(self):
+        content = self.fetcher._clean_content("word " * 5000)
+        self.assertEqual(len(content), MAX_CONTENT_LENGTH + 3)
+        self.assertTrue(content.endswith("..."))
+
+    def test_markup_heavy_content_keeps_full_text_budget(self):
+        # Markup is most of the input, as in an RSS content:encoded body
+        paragraph = '<p class="body-copy"><a href="https://example.com/article/123" class="inline-link">AI</a> tools for SMEs</p>\n'
+        content = self.fetcher._clean_content(paragraph * 400)
+        self.assertEqual(len(content), MAX_CONTENT_LENGTH + 3)
+        self.assertNotIn('<', content)
+        self.assertNotIn('href', content)
+
+    def test_empty_content(self):
+        self.assertEqual(self.fetcher._clean_content(""), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+# The app modules import each other by bare name
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from summarizer import NewsletterSummarizer, MAX_MESSAGE_LENGTH, _BULLET_RE, _utf16_len
+
+class FormatSummaryTest(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+            self.summarizer = NewsletterSummarizer()
+
+    def test_short_summary_is_kept_whole(self):
+        message = self.summarizer._format_summary("Overview\n- one\n- two", "Weekly AI")
+        self.assertIn("📰 **Weekly AI**", message)
+        self.assertIn("Overview\n• one\n• two", message)
+
+    def test_long_summary_fits_telegram_limit_in_utf16_units(self):
+        # Each emoji is two UTF-16 code units but one Python character
+        message = self.summarizer._format_summary("🚀" * 3000, "Weekly AI")
+        self.assertLessEqual(_utf16_len(message), MAX_MESSAGE_LENGTH)
+        self.assertIn("...", message)
+
+    def test_truncation_never_splits_a_surrogate_pair(self):
+        message = self.summarizer._format_summary("a" + "🚀" * 3000, "Weekly AI")
+        # Strict decoding fails on a lone surrogate
+        message.encode('utf-16-le').decode('utf-16-le')
+        self.assertNotIn('�', message)
+
+    def test_title_longer_than_budget_leaves_no_summary(self):
+        message = self.summarizer._format_summary("summary text " * 100, "T" * (MAX_MESSAGE_LENGTH + 10))
+        self.assertNotIn("summary text", message)
+        self.assertIn("...", message)
+
+class BulletPatternTest(unittest.TestCase):
+    def test_markers_are_normalized(self):
+        text = "- dash\n* star\n  •bullet\n\t- indented"
+        self.assertEqual(_BULLET_RE.sub('• ', text), "• dash\n• star\n• bullet\n• indented")
+
+    def test_hyphens_inside_lines_are_untouched(self):
+        text = "cost-effective tools\n-not a bullet\n2 * 3"
+        self.assertEqual(_BULLET_RE.sub('• ', text), text)
+
+if __name__ == '__main__':
+    unittest.main()